@@ -216,8 +216,10 @@ class DataSourceManager:
                 "imported_count": 0
             }
         
+        now_iso = datetime.now().isoformat()
+        
         # Generate unique import ID
-        import_id = hashlib.md5(f"{source_path}{datetime.now().isoformat()}".encode()).hexdigest()[:8]
+        import_id = hashlib.md5(f"{source_path}{now_iso}".encode()).hexdigest()[:8]
         import_dir = self.sources_path / import_id
         import_dir.mkdir(parents=True, exist_ok=True)
         
@@ -229,7 +231,7 @@ class DataSourceManager:
             "imported_files": [],
             "skipped_files": [],
             "errors": [],
-            "import_time": datetime.now().isoformat()
+            "import_time": now_iso
         }
         
         # Apply filters
@@ -280,7 +282,7 @@ class DataSourceManager:
                 reference_file = import_dir / "source_reference.json"
                 reference_data = {
                     "source_path": str(source),
-                    "reference_time": datetime.now().isoformat(),
+                    "reference_time": now_iso,
                     "note": "This is a reference link. Original files remain at source location."
                 }
                 reference_file.write_text(json.dumps(reference_data, indent=2))
@@ -364,14 +366,15 @@ class DataSourceManager:
         
         Logs all data access and modifications for compliance.
         """
+        now = datetime.now()
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
             "action": action,
             "details": details
         }
         
         # Daily log file
-        log_file = self.audit_log_path / f"audit_{datetime.now().strftime('%Y%m%d')}.jsonl"
+        log_file = self.audit_log_path / f"audit_{now.strftime('%Y%m%d')}.jsonl"
         
         try:
             with open(log_file, 'a') as f:
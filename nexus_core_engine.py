@@ -3,11 +3,19 @@ The Nexus Core - Main RAG Engine
 Handles hierarchical conversation logging, quality validation, and semantic search.
 """
 
+import atexit
 import json
 import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, TextIO
+from functools import lru_cache
 import hashlib
 
 # Optional dependencies - graceful degradation if not available
@@ -23,6 +31,76 @@ try:
 except ImportError:
     LANGCHAIN_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+@lru_cache(maxsize=4096)
+def _score_quality(user_message: str, assistant_response: str) -> float:
+    """
+    Score a message pair. Cached because agent loops log identical turns often;
+    see _score_quality.cache_info() for hit rates.
+    """
+    score = 1.0
+    
+    # Check message length
+    if len(user_message) < 5:
+        score -= 0.2
+    if len(assistant_response) < 10:
+        score -= 0.3
+    
+    # Check for excessive repetition
+    user_words = user_message.lower().split()
+    assistant_words = assistant_response.lower().split()
+    
+    if len(set(user_words)) < len(user_words) * 0.5:
+        score -= 0.2
+    if len(set(assistant_words)) < len(assistant_words) * 0.5:
+        score -= 0.2
+    
+    # Check for coherence (basic heuristic: presence of punctuation and complete sentences)
+    if "." not in assistant_response and "!" not in assistant_response and "?" not in assistant_response:
+        score -= 0.1
+    
+    return max(0.0, min(1.0, score))
+
+
+# One logged turn in a session file, as written by log_conversation_turn
+_TURN_RE = re.compile(r"### User\n(.*?)\n\n### Assistant\n(.*?)\n\n---\n", re.DOTALL)
+
+# Markdown markers dropped from plain-text exports
+_MD_STRIP_RE = re.compile(r"#|\*\*")
+
+# Engines still open at interpreter exit; held weakly so registering for the
+# exit hook doesn't keep discarded engines (and their handles) alive
+_open_engines: "weakref.WeakSet[NexusCoreEngine]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open_engines():
+    for engine in list(_open_engines):
+        engine.close()
+
+
+def _persist_pending_inserts(vector_index, persist_dir: str, pending: Dict[str, int]):
+    """
+    Persist a vector index if it has unsaved inserts.
+    
+    Module-level so it can also run as a weakref.finalize callback for
+    engines dropped without close().
+    """
+    if not pending["inserts"]:
+        return
+    
+    try:
+        vector_index.storage_context.persist(persist_dir=persist_dir)
+        pending["inserts"] = 0
+    except Exception as e:
+        print(f"Warning: Could not persist vector index: {e}")
+
 
 class NexusCoreEngine:
     """
@@ -30,8 +108,22 @@ class NexusCoreEngine:
     Works with zero dependencies but enhanced with LlamaIndex/LangChain if available.
     """
     
-    def __init__(self, base_path: str = "./nexus_data"):
-        """Initialize the Nexus Core engine."""
+    def __init__(
+        self,
+        base_path: str = "./nexus_data",
+        max_open_files: int = 128,
+        flush_interval: float = 2.0,
+        index_persist_every: int = 32
+    ):
+        """
+        Initialize the Nexus Core engine.
+        
+        Args:
+            base_path: Root directory for conversations, indices and sessions
+            max_open_files: Session files kept open for buffered appends
+            flush_interval: Seconds between automatic flushes of index state
+            index_persist_every: Vector index inserts between persists to disk
+        """
         self.base_path = Path(base_path)
         self.conversations_path = self.base_path / "conversations"
         self.index_path = self.base_path / "indices"
@@ -42,13 +134,41 @@ class NexusCoreEngine:
         self.index_path.mkdir(parents=True, exist_ok=True)
         self.sessions_path.mkdir(parents=True, exist_ok=True)
         
+        # session_id -> conversation file, so lookups skip walking the tree
+        self.session_index_path = self.sessions_path / "index.json"
+        self.session_index = self._load_session_index()
+        self._session_index_dirty = False
+        
+        # Full-text keyword index (None -> fall back to scanning files); the
+        # connection is shared across threads, so every use holds the lock
+        self._keyword_lock = threading.Lock()
+        self.keyword_index = self._init_keyword_index()
+        
+        # Buffered append handles for session files (LRU-capped); the lock
+        # keeps one thread from closing a handle another is writing to
+        self._file_lock = threading.Lock()
+        self._file_handles: "OrderedDict[Path, TextIO]" = OrderedDict()
+        self.max_open_files = max_open_files
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        _open_engines.add(self)
+        
         # Initialize components based on available dependencies
         self.vector_index = None
         self.memory = None
+        self.index_persist_every = index_persist_every
+        # Unsaved vector index inserts; a dict so the finalizer shares it
+        self._index_pending = {"inserts": 0}
         
         if LLAMA_INDEX_AVAILABLE:
             self._init_vector_index()
         
+        if self.vector_index:
+            weakref.finalize(
+                self, _persist_pending_inserts,
+                self.vector_index, str(self.index_path / "vector_store"), self._index_pending
+            )
+        
         if LANGCHAIN_AVAILABLE:
             self.memory = ConversationBufferMemory()
     
@@ -71,6 +191,185 @@ class NexusCoreEngine:
             print(f"Warning: Could not initialize vector index: {e}")
             self.vector_index = None
     
+    def _init_keyword_index(self) -> Optional[sqlite3.Connection]:
+        """
+        Open or create the SQLite FTS5 keyword index.
+        
+        Runs in autocommit mode so each insert holds the write lock only
+        briefly; other engines on the same base_path can log concurrently.
+        """
+        db_path = self.index_path / "keyword_index.db"
+        conn = None
+        
+        try:
+            conn = sqlite3.connect(str(db_path), isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            
+            # Serializes setup and reconciliation between engines sharing the index
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE name = 'conv_fts'"
+                ).fetchone()
+                if row and "trigram" not in row[0]:
+                    # Older word-tokenized index; rebuild for substring matching
+                    conn.execute("DROP TABLE conv_fts")
+                    row = None
+                if row is None:
+                    conn.execute(
+                        "CREATE VIRTUAL TABLE conv_fts USING fts5("
+                        "session_id UNINDEXED, path UNINDEXED, date UNINDEXED, body, "
+                        "tokenize='trigram')"
+                    )
+                    conn.execute("DROP TABLE IF EXISTS conv_files")
+                # Byte size of each session file as of its last indexed turn
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS conv_files(path TEXT PRIMARY KEY, size INTEGER)"
+                )
+                self._reconcile_keyword_index(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            print(f"Warning: Keyword index unavailable, using file scan: {e}")
+            if conn is not None:
+                conn.close()
+            return None
+        
+        return conn
+    
+    def _reconcile_keyword_index(self, conn: sqlite3.Connection):
+        """
+        Re-index session files whose size differs from the indexed size.
+        
+        Covers conversations logged before the index existed and turns logged
+        while it was unavailable (locked, or after close()). Files are indexed
+        one row per turn, matching log_conversation_turn.
+        """
+        indexed_sizes = dict(conn.execute("SELECT path, size FROM conv_files"))
+        
+        for file_path in self.conversations_path.rglob("*.md"):
+            path_str = str(file_path)
+            try:
+                if file_path.stat().st_size == indexed_sizes.get(path_str):
+                    continue
+                
+                date = "/".join(file_path.relative_to(self.conversations_path).parts[:-1])
+                raw = file_path.read_bytes()
+                content = raw.decode("utf-8")
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Warning: Could not index {file_path}: {e}")
+                continue
+            
+            # Files not in the logged-turn format are indexed whole
+            bodies = [f"{user}\n{assistant}" for user, assistant in _TURN_RE.findall(content)]
+            conn.execute("DELETE FROM conv_fts WHERE path = ?", (path_str,))
+            conn.executemany(
+                "INSERT INTO conv_fts(session_id, path, date, body) VALUES (?, ?, ?, ?)",
+                [(file_path.stem, path_str, date, body) for body in bodies or [content]]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO conv_files(path, size) VALUES (?, ?)",
+                (path_str, len(raw))
+            )
+    
+    def _load_session_index(self) -> Dict[str, str]:
+        """Load the session_id -> file path index."""
+        if self.session_index_path.exists():
+            try:
+                return json.loads(self.session_index_path.read_text(encoding="utf-8"))
+            except Exception as e:
+                print(f"Warning: Could not load session index: {e}")
+        
+        return {}
+    
+    def _save_session_index(self):
+        """Atomically write the session index (temp file + rename) if it changed."""
+        if not self._session_index_dirty:
+            return
+        
+        tmp_path = self.session_index_path.with_suffix(".tmp")
+        try:
+            tmp_path.write_text(json.dumps(self.session_index, indent=2), encoding="utf-8")
+            os.replace(tmp_path, self.session_index_path)
+            self._session_index_dirty = False
+        except Exception as e:
+            print(f"Warning: Could not save session index: {e}")
+    
+    def _index_session(self, session_id: str, file_path: Path):
+        """Record a session's file path; written out on the next flush."""
+        path_str = str(file_path)
+        if self.session_index.get(session_id) != path_str:
+            self.session_index[session_id] = path_str
+            self._session_index_dirty = True
+    
+    def _get_file_handle(self, file_path: Path) -> TextIO:
+        """
+        Get a buffered append handle, evicting the least recently used one.
+        
+        Callers must hold _file_lock while using the returned handle.
+        """
+        fh = self._file_handles.get(file_path)
+        if fh is not None:
+            self._file_handles.move_to_end(file_path)
+            return fh
+        
+        fh = open(file_path, "a", encoding="utf-8", buffering=8192)
+        self._file_handles[file_path] = fh
+        
+        while len(self._file_handles) > self.max_open_files:
+            _, old_fh = self._file_handles.popitem(last=False)
+            old_fh.close()
+        
+        return fh
+    
+    def _persist_vector_index(self):
+        """Persist the vector index if it has unsaved inserts."""
+        if self.vector_index:
+            _persist_pending_inserts(
+                self.vector_index, str(self.index_path / "vector_store"), self._index_pending
+            )
+    
+    def flush(self):
+        """Write pending index state and vector index inserts to disk."""
+        self._flush_buffers()
+        self._persist_vector_index()
+    
+    def _flush_buffers(self):
+        """Write the session index."""
+        self._save_session_index()
+        self._last_flush = time.monotonic()
+    
+    def __enter__(self) -> "NexusCoreEngine":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def close(self):
+        """Flush and close all open session files and indices."""
+        _open_engines.discard(self)
+        self._persist_vector_index()
+        self._save_session_index()
+        
+        with self._file_lock:
+            while self._file_handles:
+                _, fh = self._file_handles.popitem(last=False)
+                try:
+                    fh.close()
+                except Exception as e:
+                    print(f"Warning: Could not close session file: {e}")
+        
+        with self._keyword_lock:
+            if self.keyword_index is not None:
+                try:
+                    self.keyword_index.close()
+                except sqlite3.Error as e:
+                    print(f"Warning: Could not close keyword index: {e}")
+                self.keyword_index = None
+    
     def log_conversation_turn(
         self, 
         session_id: str,
@@ -127,9 +426,41 @@ class NexusCoreEngine:
 ---
 """
         
-        # Append to conversation file
-        with open(conversation_file, "a", encoding="utf-8") as f:
-            f.write(md_entry)
+        # Append through a kept-open handle; flushing per turn keeps the file
+        # current for readers while still skipping the open/close
+        with self._file_lock:
+            fh = self._get_file_handle(conversation_file)
+            fh.write(md_entry)
+            fh.flush()
+            file_size = os.fstat(fh.fileno()).st_size
+        
+        with self._keyword_lock:
+            if self.keyword_index is not None:
+                # Turns missed here are picked up by the next open's reconcile
+                try:
+                    self.keyword_index.execute("BEGIN")
+                    try:
+                        self.keyword_index.execute(
+                            "INSERT INTO conv_fts(session_id, path, date, body) VALUES (?, ?, ?, ?)",
+                            (
+                                session_id,
+                                str(conversation_file),
+                                f"{now.year}/{now.month:02d}/{now.day:02d}",
+                                f"{user_message}\n{assistant_response}"
+                            )
+                        )
+                        self.keyword_index.execute(
+                            "INSERT OR REPLACE INTO conv_files(path, size) VALUES (?, ?)",
+                            (str(conversation_file), file_size)
+                        )
+                        self.keyword_index.execute("COMMIT")
+                    except BaseException:
+                        self.keyword_index.execute("ROLLBACK")
+                        raise
+                except sqlite3.Error as e:
+                    print(f"Warning: Could not update keyword index: {e}")
+        
+        self._index_session(session_id, conversation_file)
         
         # Update vector index if available
         if self.vector_index and LLAMA_INDEX_AVAILABLE:
@@ -144,10 +475,17 @@ class NexusCoreEngine:
                     }
                 )
                 self.vector_index.insert(doc)
-                self.vector_index.storage_context.persist(persist_dir=str(self.index_path / "vector_store"))
+                
+                # Persisting rewrites the whole index, so batch it
+                self._index_pending["inserts"] += 1
+                if self._index_pending["inserts"] >= self.index_persist_every:
+                    self._persist_vector_index()
             except Exception as e:
                 print(f"Warning: Could not update vector index: {e}")
         
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        
         return {
             "session_id": session_id,
             "timestamp": timestamp,
@@ -165,28 +503,21 @@ class NexusCoreEngine:
         - 0.5: Medium quality
         - 0.0: Low quality (too short, repetitive, incoherent)
         """
-        score = 1.0
-        
-        # Check message length
-        if len(user_message) < 5:
-            score -= 0.2
-        if len(assistant_response) < 10:
-            score -= 0.3
-        
-        # Check for excessive repetition
-        user_words = user_message.lower().split()
-        assistant_words = assistant_response.lower().split()
-        
-        if len(set(user_words)) < len(user_words) * 0.5:
-            score -= 0.2
-        if len(set(assistant_words)) < len(assistant_words) * 0.5:
-            score -= 0.2
-        
-        # Check for coherence (basic heuristic: presence of punctuation and complete sentences)
-        if "." not in assistant_response and "!" not in assistant_response and "?" not in assistant_response:
-            score -= 0.1
+        return _score_quality(user_message, assistant_response)
+    
+    def validate_conversation_quality_batch(
+        self,
+        user_messages: List[str],
+        assistant_responses: List[str]
+    ) -> List[float]:
+        """
+        Score many turns at once (log replay / backfill).
         
-        return max(0.0, min(1.0, score))
+        Bypasses the per-pair cache so a bulk pass over mostly-unique turns
+        doesn't evict the entries live logging benefits from.
+        """
+        score = _score_quality.__wrapped__
+        return [score(u, a) for u, a in zip(user_messages, assistant_responses)]
     
     def semantic_search(
         self,
@@ -238,6 +569,15 @@ class NexusCoreEngine:
         results = []
         query_lower = query.lower()
         
+        # Trigram matching needs at least three characters
+        if len(query) >= 3:
+            with self._keyword_lock:
+                if self.keyword_index is not None:
+                    try:
+                        return self._indexed_keyword_search(query, top_k, time_filter)
+                    except sqlite3.Error as e:
+                        print(f"Warning: Keyword index search failed, using file scan: {e}")
+        
         # Determine search path based on time filter
         if time_filter:
             year = time_filter.get("year")
@@ -259,9 +599,11 @@ class NexusCoreEngine:
             for file_path in search_path.rglob("*.md"):
                 try:
                     content = file_path.read_text(encoding="utf-8")
-                    if query_lower in content.lower():
-                        # Count occurrences for simple relevance scoring
-                        score = content.lower().count(query_lower) / len(content.split())
+                    content_lower = content.lower()
+                    count = content_lower.count(query_lower)
+                    if count:
+                        # Occurrences per word; counting spaces avoids building a token list
+                        score = count / (content_lower.count(" ") + 1)
                         
                         results.append({
                             "text": content[:500] + "...",  # Preview
@@ -278,13 +620,76 @@ class NexusCoreEngine:
         results.sort(key=lambda x: x["score"], reverse=True)
         return results[:top_k]
     
+    def _indexed_keyword_search(
+        self,
+        query: str,
+        top_k: int,
+        time_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Case-insensitive substring search over the FTS5 trigram index.
+        
+        Matches the file scan's semantics, but ranks sessions by BM25 of their
+        best-matching turn and returns that turn's snippet.
+        """
+        where = "conv_fts MATCH ?"
+        params: List[Any] = ['"' + query.replace('"', '""') + '"']
+        
+        if time_filter:
+            parts = []
+            if time_filter.get("year"):
+                parts.append(str(time_filter["year"]))
+            if time_filter.get("month"):
+                parts.append(f"{time_filter['month']:02d}")
+            if time_filter.get("day"):
+                parts.append(f"{time_filter['day']:02d}")
+            
+            if parts:
+                prefix = "/".join(parts)
+                where += " AND (date = ? OR date LIKE ?)"
+                params.extend([prefix, prefix + "/%"])
+        
+        # One result per session file: the snippet comes from the row with
+        # the best (lowest) rank. MATERIALIZED keeps bm25() out of the GROUP BY
+        sql = (
+            "WITH hits AS MATERIALIZED ("
+            "SELECT session_id, path, snippet(conv_fts, 3, '', '', '...', 64) AS snip, "
+            f"bm25(conv_fts) AS bm25_rank FROM conv_fts WHERE {where}) "
+            "SELECT session_id, path, snip, MIN(bm25_rank) FROM hits "
+            "GROUP BY path ORDER BY MIN(bm25_rank) LIMIT ?"
+        )
+        params.append(top_k)
+        
+        results = []
+        for session_id, path, snippet, rank in self.keyword_index.execute(sql, params):
+            results.append({
+                "text": snippet,
+                "score": -rank,  # bm25() is lower-is-better
+                "metadata": {
+                    "file_path": path,
+                    "session_id": session_id
+                }
+            })
+        
+        return results
+    
     def get_session_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get summary of a specific session."""
-        # Search for session file
-        for file_path in self.conversations_path.rglob(f"{session_id}.md"):
+        # Indexed lookup first; fall back to a tree walk for sessions logged
+        # before the index existed (or whose file has since moved)
+        indexed = self.session_index.get(session_id)
+        if indexed and Path(indexed).exists():
+            candidates = [Path(indexed)]
+        else:
+            candidates = self.conversations_path.rglob(f"{session_id}.md")
+        
+        for file_path in candidates:
             try:
                 content = file_path.read_text(encoding="utf-8")
                 
+                if str(file_path) != indexed:
+                    self._index_session(session_id, file_path)
+                
                 # Parse markdown to extract entries
                 entries = content.split("---")
                 
@@ -316,12 +721,14 @@ class NexusCoreEngine:
                 "file_path": str(file_path),
                 "raw_content": content
             }
+            if ORJSON_AVAILABLE:
+                return orjson.dumps(export_data, option=orjson.OPT_INDENT_2).decode("utf-8")
             return json.dumps(export_data, indent=2)
         elif output_format == "md":
             return content
         elif output_format == "txt":
             # Strip markdown formatting
-            return content.replace("#", "").replace("**", "").replace("---", "\n")
+            return _MD_STRIP_RE.sub("", content).replace("---", "\n")
         else:
             return content
 
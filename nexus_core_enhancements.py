@@ -3,11 +3,21 @@ The Nexus Core - Advanced Enhancement Features
 Addresses 7 common RAG system complaints with production-ready solutions.
 """
 
-from typing import Dict, List, Optional, Any, Set, Tuple
+from typing import Dict, List, Optional, Any, Set, Tuple, FrozenSet, Deque
 from datetime import datetime
-import hashlib
+from functools import lru_cache
+from bisect import bisect_right
+from itertools import accumulate
 import re
-from collections import defaultdict, Counter
+import time
+from collections import Counter, deque, OrderedDict
+
+# Optional dependencies - graceful degradation if not available
+try:
+    from datasketch import MinHash, MinHashLSH
+    DATASKETCH_AVAILABLE = True
+except ImportError:
+    DATASKETCH_AVAILABLE = False
 
 
 class CitationManager:
@@ -16,8 +26,14 @@ class CitationManager:
     Track and format source attributions for every response.
     """
     
-    def __init__(self):
-        self.citation_map: Dict[str, List[Dict[str, Any]]] = {}
+    def __init__(self, max_responses: int = 10_000):
+        """
+        Args:
+            max_responses: Responses whose citations are kept; least recently
+                cited responses are evicted first
+        """
+        self.max_responses = max_responses
+        self.citation_map: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
     
     def add_citation(
         self,
@@ -29,9 +45,6 @@ class CitationManager:
         metadata: Optional[Dict[str, Any]] = None
     ):
         """Add a citation for a response."""
-        if response_id not in self.citation_map:
-            self.citation_map[response_id] = []
-        
         citation = {
             "source_id": source_id,
             "source_type": source_type,
@@ -41,7 +54,16 @@ class CitationManager:
             "metadata": metadata or {}
         }
         
-        self.citation_map[response_id].append(citation)
+        citations = self.citation_map.get(response_id)
+        if citations is None:
+            citations = self.citation_map[response_id] = []
+        else:
+            self.citation_map.move_to_end(response_id)
+        
+        citations.append(citation)
+        
+        while len(self.citation_map) > self.max_responses:
+            self.citation_map.popitem(last=False)
     
     def format_citations(
         self,
@@ -59,32 +81,30 @@ class CitationManager:
         citations = self.citation_map[response_id]
         
         if format_style == "numbered":
-            lines = ["**Sources:**"]
-            for i, cit in enumerate(citations, 1):
-                lines.append(f"{i}. {cit['source_type']} ({cit['source_id']}) - Relevance: {cit['relevance_score']:.2f}")
-                lines.append(f"   \"{cit['excerpt'][:100]}...\"")
-            return "\n".join(lines)
+            lines = [
+                f"{i}. {cit['source_type']} ({cit['source_id']}) - Relevance: {cit['relevance_score']:.2f}\n"
+                f"   \"{cit['excerpt'][:100]}...\""
+                for i, cit in enumerate(citations, 1)
+            ]
+            return "\n".join(["**Sources:**"] + lines)
         
         elif format_style == "inline":
-            parts = []
-            for cit in citations:
-                parts.append(f"[{cit['source_id']}]")
-            return " ".join(parts)
+            return " ".join([f"[{cit['source_id']}]" for cit in citations])
         
         elif format_style == "footnote":
-            lines = []
-            for i, cit in enumerate(citations, 1):
-                lines.append(f"[^{i}]: {cit['source_type']} - {cit['source_id']}")
-            return "\n".join(lines)
+            return "\n".join([
+                f"[^{i}]: {cit['source_type']} - {cit['source_id']}"
+                for i, cit in enumerate(citations, 1)
+            ])
         
         elif format_style == "apa":
-            lines = ["**References:**"]
-            for cit in citations:
-                meta = cit.get("metadata", {})
-                author = meta.get("author", "Unknown")
-                year = meta.get("year", "n.d.")
-                lines.append(f"{author} ({year}). {cit['source_id']}. Retrieved from {cit['source_type']}")
-            return "\n".join(lines)
+            lines = [
+                f"{cit.get('metadata', {}).get('author', 'Unknown')} "
+                f"({cit.get('metadata', {}).get('year', 'n.d.')}). "
+                f"{cit['source_id']}. Retrieved from {cit['source_type']}"
+                for cit in citations
+            ]
+            return "\n".join(["**References:**"] + lines)
         
         return ""
     
@@ -95,8 +115,15 @@ class CitationManager:
         
         citations = self.citation_map[response_id]
         
-        avg_relevance = sum(c["relevance_score"] for c in citations) / len(citations)
-        unique_sources = len(set(c["source_id"] for c in citations))
+        # One pass for both the relevance total and the distinct sources
+        total_relevance = 0.0
+        sources = set()
+        for c in citations:
+            total_relevance += c["relevance_score"]
+            sources.add(c["source_id"])
+        
+        avg_relevance = total_relevance / len(citations)
+        unique_sources = len(sources)
         
         quality = "poor"
         if avg_relevance > 0.8 and unique_sources >= 3:
@@ -141,27 +168,28 @@ class ContextWindowManager:
         if not messages:
             return []
         
-        # Estimate tokens (rough: 4 chars = 1 token)
-        def estimate_tokens(text: str) -> int:
-            return len(text) // 4
-        
-        total_tokens = sum(estimate_tokens(msg["content"]) for msg in messages)
+        # Estimate tokens (rough: 4 chars = 1 token), once per message
+        token_lens = [len(msg["content"]) // 4 for msg in messages]
         
-        if total_tokens <= self.max_tokens:
+        if sum(token_lens) <= self.max_tokens:
             return messages
         
         # Apply compression strategy
         if priorities:
-            return self._priority_based_compression(messages, priorities)
+            return self._priority_based_compression(messages, priorities, token_lens)
         else:
-            return self._recency_based_compression(messages)
+            return self._recency_based_compression(messages, token_lens)
     
     def _priority_based_compression(
         self,
         messages: List[Dict[str, str]],
-        priorities: List[float]
+        priorities: List[float],
+        token_lens: Optional[List[int]] = None
     ) -> List[Dict[str, str]]:
         """Keep highest priority messages."""
+        if token_lens is None:
+            token_lens = [len(msg["content"]) // 4 for msg in messages]
+        
         # Sort by priority (descending)
         indexed_messages = list(zip(messages, priorities, range(len(messages))))
         indexed_messages.sort(key=lambda x: x[1], reverse=True)
@@ -170,7 +198,7 @@ class ContextWindowManager:
         token_count = 0
         
         for msg, priority, original_idx in indexed_messages:
-            msg_tokens = len(msg["content"]) // 4
+            msg_tokens = token_lens[original_idx]
             if token_count + msg_tokens <= self.max_tokens:
                 compressed.append((msg, original_idx))
                 token_count += msg_tokens
@@ -181,22 +209,19 @@ class ContextWindowManager:
     
     def _recency_based_compression(
         self,
-        messages: List[Dict[str, str]]
+        messages: List[Dict[str, str]],
+        token_lens: Optional[List[int]] = None
     ) -> List[Dict[str, str]]:
         """Keep most recent messages."""
-        compressed = []
-        token_count = 0
+        if token_lens is None:
+            token_lens = [len(msg["content"]) // 4 for msg in messages]
         
-        # Start from most recent
-        for msg in reversed(messages):
-            msg_tokens = len(msg["content"]) // 4
-            if token_count + msg_tokens <= self.max_tokens:
-                compressed.insert(0, msg)
-                token_count += msg_tokens
-            else:
-                break
+        # Running totals from the most recent message backwards; the cutoff is
+        # the last point where the total still fits
+        cumulative = list(accumulate(reversed(token_lens)))
+        keep = bisect_right(cumulative, self.max_tokens)
         
-        return compressed
+        return messages[len(messages) - keep:]
     
     def summarize_dropped_context(
         self,
@@ -218,6 +243,12 @@ class DeduplicationEngine:
     Remove duplicate or near-duplicate search results.
     """
     
+    # Below this many results the pairwise scan is cheaper than MinHash LSH
+    MINHASH_MIN_RESULTS = 32
+    MINHASH_NUM_PERM = 128
+    # Shared run length (in tokens) that marks long documents as duplicates
+    MIN_MATCH_TOKENS = 50
+    
     def __init__(self, similarity_threshold: float = 0.85):
         self.similarity_threshold = similarity_threshold
     
@@ -229,10 +260,12 @@ class DeduplicationEngine:
         """
         Remove duplicates from search results.
         
-        Methods: "hash", "semantic", "hybrid"
+        Methods: "hash", "semantic", "hybrid", "substring"
         """
         if method == "hash":
             return self._hash_based_dedup(results)
+        elif method == "substring":
+            return self._substring_dedup(results)
         elif method == "semantic":
             return self._semantic_dedup(results)
         else:  # hybrid
@@ -246,15 +279,16 @@ class DeduplicationEngine:
         results: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """Remove exact duplicates using content hashing."""
-        seen_hashes: Set[str] = set()
+        # str hashes are computed once and cached by Python; no need to encode
+        # and digest each text, and set membership stays exact on collisions
+        seen: Set[str] = set()
         deduped = []
         
         for result in results:
             content = result.get("text", "")
-            content_hash = hashlib.md5(content.encode()).hexdigest()
             
-            if content_hash not in seen_hashes:
-                seen_hashes.add(content_hash)
+            if content not in seen:
+                seen.add(content)
                 deduped.append(result)
         
         return deduped
@@ -264,23 +298,128 @@ class DeduplicationEngine:
         results: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """Remove near-duplicates using semantic similarity."""
+        if DATASKETCH_AVAILABLE and len(results) >= self.MINHASH_MIN_RESULTS:
+            return self._minhash_dedup(results)
+        
         deduped = []
+        kept_tokens: List[FrozenSet[str]] = []
         
+        # Tokenize each result once instead of once per comparison
         for result in results:
+            tokens = frozenset(result.get("text", "").lower().split())
+            size = len(tokens)
             is_duplicate = False
             
-            for existing in deduped:
-                similarity = self._calculate_similarity(
-                    result.get("text", ""),
-                    existing.get("text", "")
-                )
-                
-                if similarity >= self.similarity_threshold:
-                    is_duplicate = True
-                    break
+            if tokens:
+                for existing in kept_tokens:
+                    existing_size = len(existing)
+                    if not existing_size:
+                        continue
+                    
+                    # Jaccard(A, B) <= min(|A|, |B|) / max(|A|, |B|); skip pairs
+                    # whose sizes alone rule out reaching the threshold
+                    if min(size, existing_size) < self.similarity_threshold * max(size, existing_size):
+                        continue
+                    
+                    # Jaccard; |A ∪ B| = |A| + |B| - |A ∩ B| avoids building the union
+                    intersection = len(tokens & existing)
+                    similarity = intersection / (size + existing_size - intersection)
+                    
+                    if similarity >= self.similarity_threshold:
+                        is_duplicate = True
+                        break
             
             if not is_duplicate:
                 deduped.append(result)
+                kept_tokens.append(tokens)
+        
+        return deduped
+    
+    def _minhash_dedup(
+        self,
+        results: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Near-duplicate removal via MinHash LSH (avoids the O(N²) scan).
+        
+        LSH candidates include false positives, so each one is confirmed with
+        the exact Jaccard similarity before a result is dropped.
+        """
+        lsh = MinHashLSH(threshold=self.similarity_threshold, num_perm=self.MINHASH_NUM_PERM)
+        kept_tokens: Dict[str, FrozenSet[str]] = {}
+        deduped = []
+        
+        for i, result in enumerate(results):
+            tokens = frozenset(result.get("text", "").lower().split())
+            
+            # Empty texts never match anything (same as _calculate_similarity)
+            if not tokens:
+                deduped.append(result)
+                continue
+            
+            signature = MinHash(num_perm=self.MINHASH_NUM_PERM)
+            for token in tokens:
+                signature.update(token.encode("utf-8"))
+            
+            is_duplicate = False
+            for key in lsh.query(signature):
+                existing = kept_tokens[key]
+                intersection = len(tokens & existing)
+                if intersection / (len(tokens) + len(existing) - intersection) >= self.similarity_threshold:
+                    is_duplicate = True
+                    break
+            
+            if is_duplicate:
+                continue
+            
+            key = str(i)
+            lsh.insert(key, signature)
+            kept_tokens[key] = tokens
+            deduped.append(result)
+        
+        return deduped
+    
+    def _substring_dedup(
+        self,
+        results: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Remove long documents that share a run of MIN_MATCH_TOKENS tokens.
+        
+        Jaccard over whole documents misses long texts that only share a
+        passage. Each token window is stored as its hash (one int, mapped to
+        where it first occurred) rather than as a tuple of tokens, so memory
+        grows linearly with total tokens; hash hits are confirmed against the
+        tokens before a document is dropped.
+        """
+        k = self.MIN_MATCH_TOKENS
+        # window hash -> kept document index << 32 | window start
+        seen_windows: Dict[int, int] = {}
+        kept_tokens: List[List[str]] = []
+        deduped = []
+        
+        for result in results:
+            tokens = result.get("text", "").lower().split()
+            hashes = [hash(tuple(tokens[i:i + k])) for i in range(len(tokens) - k + 1)]
+            
+            is_duplicate = False
+            for start, h in enumerate(hashes):
+                location = seen_windows.get(h)
+                if location is not None:
+                    other_start = location & 0xFFFFFFFF
+                    other = kept_tokens[location >> 32]
+                    if other[other_start:other_start + k] == tokens[start:start + k]:
+                        is_duplicate = True
+                        break
+            
+            if is_duplicate:
+                continue
+            
+            doc_index = len(kept_tokens)
+            kept_tokens.append(tokens)
+            for start, h in enumerate(hashes):
+                seen_windows.setdefault(h, doc_index << 32 | start)
+            deduped.append(result)
         
         return deduped
     
@@ -300,14 +439,25 @@ class DeduplicationEngine:
         return intersection / union if union > 0 else 0.0
 
 
+# 0.99 ** days for the first ten years, so recency scoring is a list index
+_RECENCY_DECAY = [0.99 ** days for days in range(3650)]
+
+
 class RelevanceRanker:
     """
     Feature 4: Result Re-ranking
     Multi-signal relevance scoring with user feedback incorporation.
     """
     
-    def __init__(self):
-        self.feedback_history: Dict[str, List[float]] = defaultdict(list)
+    def __init__(self, max_feedback_docs: int = 10_000):
+        """
+        Args:
+            max_feedback_docs: Documents whose feedback is kept; least recently
+                rated documents are evicted first
+        """
+        self.max_feedback_docs = max_feedback_docs
+        # doc_id -> (feedback count, running mean)
+        self.feedback_history: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
     
     def rerank_results(
         self,
@@ -329,14 +479,18 @@ class RelevanceRanker:
             return []
         
         reranked = []
+        now = datetime.now()
+        user_topics = set(user_context.get("topics", [])) if user_context else None
         
         for result in results:
+            metadata = result.get("metadata", {})
+            
             # Calculate combined score
             original_score = result.get("score", 0.5)
-            recency_score = self._calculate_recency(result.get("metadata", {}))
-            quality_score = result.get("metadata", {}).get("quality_score", 0.7)
-            context_score = self._calculate_context_match(result, user_context)
-            feedback_score = self._get_feedback_score(result.get("metadata", {}).get("doc_id"))
+            recency_score = self._calculate_recency(metadata, now)
+            quality_score = metadata.get("quality_score", 0.7)
+            context_score = self._calculate_context_match(result, user_context, user_topics)
+            feedback_score = self._get_feedback_score(metadata.get("doc_id"))
             
             combined_score = (
                 original_score * 0.4 +
@@ -354,7 +508,11 @@ class RelevanceRanker:
         
         return reranked
     
-    def _calculate_recency(self, metadata: Dict[str, Any]) -> float:
+    def _calculate_recency(
+        self,
+        metadata: Dict[str, Any],
+        now: Optional[datetime] = None
+    ) -> float:
         """Calculate recency score (newer = higher)."""
         timestamp_str = metadata.get("timestamp")
         if not timestamp_str:
@@ -362,9 +520,11 @@ class RelevanceRanker:
         
         try:
             timestamp = datetime.fromisoformat(timestamp_str)
-            age_days = (datetime.now() - timestamp).days
+            age_days = ((now or datetime.now()) - timestamp).days
             
             # Exponential decay: 0.99^days
+            if 0 <= age_days < len(_RECENCY_DECAY):
+                return _RECENCY_DECAY[age_days]
             return 0.99 ** age_days
         except:
             return 0.5
@@ -372,9 +532,14 @@ class RelevanceRanker:
     def _calculate_context_match(
         self,
         result: Dict[str, Any],
-        user_context: Optional[Dict[str, Any]]
+        user_context: Optional[Dict[str, Any]],
+        user_topics: Optional[Set[str]] = None
     ) -> float:
-        """Calculate how well result matches user context."""
+        """
+        Calculate how well result matches user context.
+        
+        user_topics lets batch callers pass the context's topic set once.
+        """
         if not user_context:
             return 0.5
         
@@ -386,7 +551,8 @@ class RelevanceRanker:
             score += 0.3
         
         # Check topic overlap
-        user_topics = set(user_context.get("topics", []))
+        if user_topics is None:
+            user_topics = set(user_context.get("topics", []))
         result_topics = set(metadata.get("topics", []))
         
         if user_topics and result_topics:
@@ -400,12 +566,36 @@ class RelevanceRanker:
         if not doc_id or doc_id not in self.feedback_history:
             return 0.5
         
-        feedback_list = self.feedback_history[doc_id]
-        return sum(feedback_list) / len(feedback_list)
+        return self.feedback_history[doc_id][1]
     
     def record_feedback(self, doc_id: str, score: float):
         """Record user feedback (0-1) for a document."""
-        self.feedback_history[doc_id].append(max(0.0, min(1.0, score)))
+        score = max(0.0, min(1.0, score))
+        count, mean = self.feedback_history.get(doc_id, (0, 0.0))
+        
+        # Incremental (Welford) mean: O(1) per update, no per-doc history list
+        count += 1
+        mean += (score - mean) / count
+        self.feedback_history[doc_id] = (count, mean)
+        self.feedback_history.move_to_end(doc_id)
+        
+        while len(self.feedback_history) > self.max_feedback_docs:
+            self.feedback_history.popitem(last=False)
+
+
+_TOPIC_STOP_WORDS = frozenset({"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for"})
+_WORD_RE = re.compile(r'\b\w+\b')
+
+
+@lru_cache(maxsize=2048)
+def _extract_topics_cached(text: str) -> FrozenSet[str]:
+    """Top 5 keywords of a message (cached; frozenset so it is safe to share)."""
+    words = _WORD_RE.findall(text.lower())
+    keywords = [w for w in words if w not in _TOPIC_STOP_WORDS and len(w) > 3]
+    
+    # Get top 5 most common
+    counter = Counter(keywords)
+    return frozenset(word for word, _ in counter.most_common(5))
 
 
 class ConversationThreadTracker:
@@ -414,9 +604,23 @@ class ConversationThreadTracker:
     Detect and maintain separate conversation topics.
     """
     
-    def __init__(self, topic_change_threshold: float = 0.5):
+    def __init__(
+        self,
+        topic_change_threshold: float = 0.5,
+        max_threads: Optional[int] = None
+    ):
+        """
+        Args:
+            topic_change_threshold: Topic similarity below which a new thread starts
+            max_threads: Keep only the most recent N threads (None = unbounded)
+        """
+        if max_threads is not None and max_threads < 1:
+            raise ValueError(f"max_threads must be None or at least 1, got {max_threads}")
+        
         self.topic_change_threshold = topic_change_threshold
-        self.threads: List[Dict[str, Any]] = []
+        self.threads: Deque[Dict[str, Any]] = deque(maxlen=max_threads)
+        self._thread_index: Dict[str, Dict[str, Any]] = {}
+        self._threads_started = 0
         self.current_thread_id: Optional[str] = None
     
     def process_message(
@@ -431,16 +635,11 @@ class ConversationThreadTracker:
         Returns:
             Thread info with thread_id and is_new_thread flag
         """
+        message_topics = self._extract_topics(message)
+        
         if not self.threads:
             # First message - create initial thread
-            thread_id = self._generate_thread_id()
-            self.threads.append({
-                "thread_id": thread_id,
-                "start_time": timestamp,
-                "messages": [(role, message, timestamp)],
-                "topics": self._extract_topics(message)
-            })
-            self.current_thread_id = thread_id
+            thread_id = self._start_thread(message, role, timestamp, message_topics)
             
             return {
                 "thread_id": thread_id,
@@ -452,21 +651,14 @@ class ConversationThreadTracker:
         current_thread = self._get_thread(self.current_thread_id)
         topic_similarity = self._calculate_topic_similarity(
             current_thread["topics"],
-            self._extract_topics(message)
+            message_topics
         )
         
         is_new_thread = topic_similarity < self.topic_change_threshold
         
         if is_new_thread:
             # Start new thread
-            thread_id = self._generate_thread_id()
-            self.threads.append({
-                "thread_id": thread_id,
-                "start_time": timestamp,
-                "messages": [(role, message, timestamp)],
-                "topics": self._extract_topics(message)
-            })
-            self.current_thread_id = thread_id
+            thread_id = self._start_thread(message, role, timestamp, message_topics)
             
             return {
                 "thread_id": thread_id,
@@ -484,28 +676,43 @@ class ConversationThreadTracker:
                 "similarity": topic_similarity
             }
     
+    def _start_thread(
+        self,
+        message: str,
+        role: str,
+        timestamp: datetime,
+        topics: FrozenSet[str]
+    ) -> str:
+        """Create a new thread, make it current, and return its ID."""
+        thread_id = self._generate_thread_id()
+        thread = {
+            "thread_id": thread_id,
+            "start_time": timestamp,
+            "messages": [(role, message, timestamp)],
+            "topics": topics
+        }
+        if self.threads.maxlen is not None and len(self.threads) == self.threads.maxlen:
+            evicted = self.threads[0]
+            del self._thread_index[evicted["thread_id"]]
+        
+        self.threads.append(thread)
+        self._thread_index[thread_id] = thread
+        self._threads_started += 1
+        self.current_thread_id = thread_id
+        
+        return thread_id
+    
     def _generate_thread_id(self) -> str:
-        """Generate unique thread ID."""
-        return f"thread_{len(self.threads)}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        """Generate unique thread ID (sequence number + epoch seconds)."""
+        return f"thread_{self._threads_started}_{int(time.time())}"
     
     def _get_thread(self, thread_id: str) -> Dict[str, Any]:
         """Get thread by ID."""
-        for thread in self.threads:
-            if thread["thread_id"] == thread_id:
-                return thread
-        return None
+        return self._thread_index.get(thread_id)
     
-    def _extract_topics(self, text: str) -> Set[str]:
+    def _extract_topics(self, text: str) -> FrozenSet[str]:
         """Extract key topics from text (simple keyword extraction)."""
-        # Remove common words
-        stop_words = {"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for"}
-        
-        words = re.findall(r'\b\w+\b', text.lower())
-        keywords = [w for w in words if w not in stop_words and len(w) > 3]
-        
-        # Get top 5 most common
-        counter = Counter(keywords)
-        return set(word for word, _ in counter.most_common(5))
+        return _extract_topics_cached(text)
     
     def _calculate_topic_similarity(self, topics1: Set[str], topics2: Set[str]) -> float:
         """Calculate Jaccard similarity between topic sets."""
@@ -539,15 +746,23 @@ class MetadataEnricher:
     Add human-readable context to search results.
     """
     
-    def enrich_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
-        """Add enriched metadata to a search result."""
+    def enrich_result(
+        self,
+        result: Dict[str, Any],
+        now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Add enriched metadata to a search result.
+        
+        Pass now when enriching many results so ages share one reference time.
+        """
         metadata = result.get("metadata", {})
         
         enriched = {
             **result,
             "enriched_metadata": {
                 "human_timestamp": self._format_timestamp(metadata.get("timestamp")),
-                "age_description": self._describe_age(metadata.get("timestamp")),
+                "age_description": self._describe_age(metadata.get("timestamp"), now),
                 "quality_label": self._label_quality(metadata.get("quality_score", 0.7)),
                 "context_summary": self._summarize_context(metadata),
                 "relevance_explanation": self._explain_relevance(result.get("score", 0.5))
@@ -556,6 +771,11 @@ class MetadataEnricher:
         
         return enriched
     
+    def enrich_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Enrich a batch of search results against a single "now"."""
+        now = datetime.now()
+        return [self.enrich_result(result, now) for result in results]
+    
     def _format_timestamp(self, timestamp_str: Optional[str]) -> str:
         """Format timestamp for human reading."""
         if not timestamp_str:
@@ -567,14 +787,18 @@ class MetadataEnricher:
         except:
             return timestamp_str
     
-    def _describe_age(self, timestamp_str: Optional[str]) -> str:
+    def _describe_age(
+        self,
+        timestamp_str: Optional[str],
+        now: Optional[datetime] = None
+    ) -> str:
         """Describe how old the content is."""
         if not timestamp_str:
             return "Unknown age"
         
         try:
             dt = datetime.fromisoformat(timestamp_str)
-            age = datetime.now() - dt
+            age = (now or datetime.now()) - dt
             
             if age.days == 0:
                 return "Today"
@@ -636,6 +860,8 @@ class QueryExpander:
     Expand queries with synonyms and related terms.
     """
     
+    DEFAULT_MAX_EXPANSIONS = 3
+    
     def __init__(self):
         # Domain-specific synonym map
         self.synonym_map = {
@@ -649,11 +875,27 @@ class QueryExpander:
             "happy": ["joyful", "pleased", "content", "glad"],
             "sad": ["unhappy", "depressed", "down", "melancholy"]
         }
+        self._build_default_expansions()
+    
+    def _build_default_expansions(self):
+        """
+        Precompute the default-size expansion list and joined string per term.
+        
+        Call again after editing synonym_map directly (add_synonyms does this).
+        """
+        self._default_expansions: Dict[str, List[str]] = {}
+        self._default_joined: Dict[str, str] = {}
+        
+        for term, synonyms in self.synonym_map.items():
+            if synonyms:
+                top = synonyms[:self.DEFAULT_MAX_EXPANSIONS]
+                self._default_expansions[term] = top
+                self._default_joined[term] = " ".join(top)
     
     def expand_query(
         self,
         query: str,
-        max_expansions: int = 3
+        max_expansions: int = DEFAULT_MAX_EXPANSIONS
     ) -> Tuple[str, List[str]]:
         """
         Expand query with synonyms and related terms.
@@ -662,6 +904,16 @@ class QueryExpander:
             (expanded_query, expansion_terms)
         """
         words = query.lower().split()
+        
+        if max_expansions == self.DEFAULT_MAX_EXPANSIONS:
+            hits = [word for word in words if word in self._default_joined]
+            if not hits:
+                return query, []
+            
+            expansions = [syn for word in hits for syn in self._default_expansions[word]]
+            expanded = query + " " + " ".join(self._default_joined[word] for word in hits)
+            return expanded, expansions
+        
         expansions = []
         
         for word in words:
@@ -684,6 +936,7 @@ class QueryExpander:
             self.synonym_map[term.lower()] = []
         
         self.synonym_map[term.lower()].extend(synonyms)
+        self._build_default_expansions()
     
     def get_expanded_terms(self, query: str) -> List[str]:
         """Get all expanded terms for a query."""
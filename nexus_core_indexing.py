@@ -3,10 +3,15 @@ The Nexus Core - Hierarchical Indexing System
 4-layer indexing architecture for 10-20x faster retrieval.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from datetime import datetime
+from itertools import islice
 import json
+import re
 
 try:
     from llama_index.core import (
@@ -14,13 +19,67 @@ try:
         SummaryIndex, 
         KeywordTableIndex,
         Document,
+        Settings,
         StorageContext,
         load_index_from_storage
     )
+    from llama_index.core.schema import MetadataMode
+    from llama_index.core.vector_stores import (
+        FilterOperator,
+        MetadataFilter,
+        MetadataFilters
+    )
     LLAMA_INDEX_AVAILABLE = True
 except ImportError:
     LLAMA_INDEX_AVAILABLE = False
 
+try:
+    from qdrant_client import QdrantClient
+    from llama_index.vector_stores.qdrant import QdrantVectorStore
+    QDRANT_AVAILABLE = True
+except ImportError:
+    QDRANT_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+_TOPIC_KEYWORDS = {
+    "medical": ("doctor", "patient", "diagnosis", "treatment", "medication"),
+    "technical": ("code", "function", "error", "debug", "api"),
+    "personal": ("feeling", "emotion", "relationship", "family", "friend"),
+    "planning": ("goal", "plan", "schedule", "task", "deadline")
+}
+
+
+def _build_topic_automaton():
+    """Build an Aho-Corasick automaton over the topic keywords, if available."""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for topic, keywords in _TOPIC_KEYWORDS.items():
+        for kw in keywords:
+            automaton.add_word(kw, topic)
+    automaton.make_automaton()
+    return automaton
+
+
+# Single-pass topic keyword matcher, built once at import
+_TOPIC_AUTOMATON = _build_topic_automaton()
+
+# Applied to lowercased text; topics it cannot fully match use substring checks
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_TIME_KEYWORDS_RE = re.compile(r"\b(?:yesterday|last week|last month|today|recent)\b")
+
 
 class HierarchicalIndexManager:
     """
@@ -31,50 +90,135 @@ class HierarchicalIndexManager:
     4. Keyword Table Index (exact match)
     """
     
-    def __init__(self, index_path: str = "./nexus_data/indices"):
-        """Initialize hierarchical index manager."""
+    VECTOR_INDICES = ("time", "topic")
+    QUERY_ENGINE_CACHE_SIZE = 32
+    
+    def __init__(
+        self,
+        index_path: str = "./nexus_data/indices",
+        insert_batch_size: int = 256,
+        vector_backend: str = "simple",
+        vector_store_factory: Optional[Callable[[str], Any]] = None
+    ):
+        """
+        Initialize hierarchical index manager.
+        
+        Args:
+            index_path: Directory holding the persisted indices and metadata
+            insert_batch_size: Nodes written per batch by the vector indices
+            vector_backend: "simple" (in-memory, JSON persisted) or "qdrant"
+                (local on-disk Qdrant with HNSW search)
+            vector_store_factory: Optional callable taking an index name
+                ("time" or "topic") and returning a LlamaIndex vector store,
+                e.g. a DiskANN or FAISS adapter; overrides vector_backend
+        """
         self.index_path = Path(index_path)
+        self.insert_batch_size = insert_batch_size
         self.index_path.mkdir(parents=True, exist_ok=True)
         
+        # When True, inserts skip persistence until bulk_mode() exits
+        self._deferred = False
+        
+        # Known topics for query routing, rebuilt lazily when topics change
+        self._topic_set = None
+        self._topic_phrases = None
+        
+        # Query engines keyed by index and search parameters, LRU-bounded
+        # and cleared whenever index contents change
+        self._query_engines = OrderedDict()
+        
         if not LLAMA_INDEX_AVAILABLE:
             print("Warning: LlamaIndex not available. Hierarchical indexing disabled.")
             self.indices = {}
             return
         
+        # Vector store backend for the time and topic layers
+        self._vector_store_factory = vector_store_factory
+        self._qdrant_client = None
+        if vector_store_factory is None:
+            if vector_backend == "qdrant":
+                if QDRANT_AVAILABLE:
+                    # Local mode locks the directory, so a second manager or
+                    # process on the same index_path fails here
+                    try:
+                        self._qdrant_client = QdrantClient(path=str(self.index_path / "qdrant"))
+                        self._vector_store_factory = self._create_qdrant_store
+                    except Exception as e:
+                        print(f"Warning: Could not open Qdrant store, using simple vector store: {e}")
+                else:
+                    print("Warning: qdrant-client not available. Using simple vector store.")
+            elif vector_backend != "simple":
+                print(f"Warning: Unknown vector backend '{vector_backend}'. Using simple vector store.")
+        
         # Initialize or load indices
-        self.indices = {
-            "summary": self._load_or_create_index("summary", SummaryIndex),
-            "time": self._load_or_create_index("time", VectorStoreIndex),
-            "topic": self._load_or_create_index("topic", VectorStoreIndex),
-            "keyword": self._load_or_create_index("keyword", KeywordTableIndex)
-        }
+        self.indices = self._create_indices()
         
         # Metadata tracking
         self.metadata_path = self.index_path / "metadata.json"
         self.metadata = self._load_metadata()
     
-    def _load_or_create_index(self, name: str, index_class):
+    def _create_indices(self) -> Dict[str, Any]:
+        """Load or create all four index layers."""
+        return {
+            "summary": self._load_or_create_index("summary", SummaryIndex),
+            "time": self._load_or_create_index(
+                "time", VectorStoreIndex, insert_batch_size=self.insert_batch_size
+            ),
+            "topic": self._load_or_create_index(
+                "topic", VectorStoreIndex, insert_batch_size=self.insert_batch_size
+            ),
+            "keyword": self._load_or_create_index("keyword", KeywordTableIndex)
+        }
+    
+    def _load_or_create_index(self, name: str, index_class, **index_kwargs):
         """Load existing index or create new one."""
         storage_path = self.index_path / name
         
+        # Vector layers keep their embeddings in the external store when one
+        # is configured; docstore and index store stay JSON-persisted
+        vector_store = None
+        if self._vector_store_factory is not None and name in self.VECTOR_INDICES:
+            vector_store = self._vector_store_factory(name)
+        
         try:
             if storage_path.exists() and (storage_path / "docstore.json").exists():
-                storage_context = StorageContext.from_defaults(persist_dir=str(storage_path))
-                return load_index_from_storage(storage_context)
+                storage_context = StorageContext.from_defaults(
+                    persist_dir=str(storage_path),
+                    vector_store=vector_store
+                )
+                return load_index_from_storage(storage_context, **index_kwargs)
             else:
                 storage_path.mkdir(parents=True, exist_ok=True)
-                index = index_class([])
+                storage_context = StorageContext.from_defaults(vector_store=vector_store)
+                index = index_class([], storage_context=storage_context, **index_kwargs)
                 index.storage_context.persist(persist_dir=str(storage_path))
                 return index
         except Exception as e:
             print(f"Warning: Could not load/create {name} index: {e}")
             return None
     
+    def _create_qdrant_store(self, name: str):
+        """Create a Qdrant vector store for one index layer."""
+        return QdrantVectorStore(collection_name=name, client=self._qdrant_client)
+    
+    def _read_json(self, path: Path) -> Any:
+        """Read a JSON file, using orjson when available."""
+        if ORJSON_AVAILABLE:
+            return orjson.loads(path.read_bytes())
+        return json.loads(path.read_text())
+    
+    def _write_json(self, path: Path, data: Any):
+        """Write a JSON file with indent 2, using orjson when available."""
+        if ORJSON_AVAILABLE:
+            path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            path.write_text(json.dumps(data, indent=2))
+    
     def _load_metadata(self) -> Dict[str, Any]:
         """Load index metadata."""
         if self.metadata_path.exists():
             try:
-                return json.loads(self.metadata_path.read_text())
+                return self._read_json(self.metadata_path)
             except Exception as e:
                 print(f"Warning: Could not load metadata: {e}")
         
@@ -89,7 +233,7 @@ class HierarchicalIndexManager:
         """Save index metadata."""
         try:
             self.metadata["last_updated"] = datetime.now().isoformat()
-            self.metadata_path.write_text(json.dumps(self.metadata, indent=2))
+            self._write_json(self.metadata_path, self.metadata)
         except Exception as e:
             print(f"Warning: Could not save metadata: {e}")
     
@@ -117,6 +261,128 @@ class HierarchicalIndexManager:
         if not LLAMA_INDEX_AVAILABLE or not all(self.indices.values()):
             return False
         
+        doc = self._build_document(text, doc_id, timestamp, topics, metadata)
+        
+        try:
+            self._insert_documents([doc])
+            self._record_document(timestamp, topics)
+            
+            if not self._deferred:
+                self._persist_indices()
+                self._save_metadata()
+            
+            return True
+            
+        except Exception as e:
+            print(f"Error adding document to hierarchical indices: {e}")
+            return False
+    
+    def add_documents_batch(self, documents: List[Dict[str, Any]]) -> int:
+        """
+        Add many documents to all indices with one insert and one persist per index.
+        
+        Args:
+            documents: Dicts with the add_document_hierarchical arguments
+                ("text", "doc_id", "timestamp", "topics", optional "metadata")
+        
+        Returns:
+            Number of documents added
+        """
+        if not documents or not LLAMA_INDEX_AVAILABLE or not all(self.indices.values()):
+            return 0
+        
+        docs = [
+            self._build_document(
+                d["text"], d["doc_id"], d["timestamp"], d["topics"], d.get("metadata")
+            )
+            for d in documents
+        ]
+        
+        try:
+            self._insert_documents(docs)
+            added = documents
+        except Exception as e:
+            print(f"Error adding document batch to hierarchical indices: {e}")
+            
+            # Retry one at a time so a single bad document doesn't drop the batch
+            added = []
+            if len(docs) > 1:
+                for d, doc in zip(documents, docs):
+                    try:
+                        self._insert_documents([doc])
+                        added.append(d)
+                    except Exception as e:
+                        print(f"Error adding document {d['doc_id']} to hierarchical indices: {e}")
+        
+        for d in added:
+            self._record_document(d["timestamp"], d["topics"])
+        
+        if added and not self._deferred:
+            try:
+                self._persist_indices()
+                self._save_metadata()
+            except Exception as e:
+                print(f"Error persisting hierarchical indices: {e}")
+                return 0
+        
+        return len(added)
+    
+    def _insert_documents(self, docs: List["Document"]):
+        """Chunk documents once and insert the nodes into all four layers."""
+        nodes = Settings.node_parser.get_nodes_from_documents(docs)
+        
+        # Embed once, before any layer is touched, so an embedding failure
+        # leaves all four layers unchanged
+        embeddings = Settings.embed_model.get_text_embedding_batch(
+            [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+        )
+        
+        # Cached engines must not outlive the index contents they were built on
+        self._query_engines.clear()
+        
+        # Layer 1: Summary index (routing) and Layer 4: Keyword index.
+        # Inserted before embeddings are attached so their docstores never
+        # store vectors
+        self.indices["summary"].insert_nodes(nodes)
+        self.indices["keyword"].insert_nodes(nodes)
+        
+        # The time and topic layers skip nodes that already carry an embedding
+        for node, embedding in zip(nodes, embeddings):
+            node.embedding = embedding
+        
+        # Layer 2: Time-based index and Layer 3: Topic-based index
+        self.indices["time"].insert_nodes(nodes)
+        self.indices["topic"].insert_nodes(nodes)
+    
+    @contextmanager
+    def bulk_mode(self):
+        """
+        Defer persistence of indices and metadata until the block exits.
+        
+        Usage:
+            with manager.bulk_mode():
+                for doc in docs:
+                    manager.add_document_hierarchical(**doc)
+        """
+        previous = self._deferred
+        self._deferred = True
+        try:
+            yield self
+        finally:
+            self._deferred = previous
+            if not previous and self.indices:
+                self._persist_indices()
+                self._save_metadata()
+    
+    def _build_document(
+        self,
+        text: str,
+        doc_id: str,
+        timestamp: datetime,
+        topics: List[str],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> "Document":
+        """Create a Document carrying the metadata every layer filters on."""
         doc_metadata = {
             "doc_id": doc_id,
             "timestamp": timestamp.isoformat(),
@@ -127,43 +393,26 @@ class HierarchicalIndexManager:
             **(metadata or {})
         }
         
-        doc = Document(text=text, metadata=doc_metadata)
+        return Document(text=text, metadata=doc_metadata)
+    
+    def _record_document(self, timestamp: datetime, topics: List[str]):
+        """Update document, topic and time-range counters."""
+        self.metadata["document_count"] += 1
         
-        try:
-            # Layer 1: Summary index (routing)
-            self.indices["summary"].insert(doc)
-            
-            # Layer 2: Time-based index
-            self.indices["time"].insert(doc)
-            
-            # Layer 3: Topic-based index
-            self.indices["topic"].insert(doc)
-            
-            # Layer 4: Keyword index
-            self.indices["keyword"].insert(doc)
-            
-            # Update metadata
-            self.metadata["document_count"] += 1
-            
-            for topic in topics:
-                self.metadata["topics"][topic] = self.metadata["topics"].get(topic, 0) + 1
-            
-            time_key = f"{timestamp.year}-{timestamp.month:02d}"
-            self.metadata["time_ranges"][time_key] = self.metadata["time_ranges"].get(time_key, 0) + 1
-            
-            # Persist all indices
-            for name, index in self.indices.items():
-                if index:
-                    storage_path = self.index_path / name
-                    index.storage_context.persist(persist_dir=str(storage_path))
-            
-            self._save_metadata()
-            
-            return True
-            
-        except Exception as e:
-            print(f"Error adding document to hierarchical indices: {e}")
-            return False
+        for topic in topics:
+            self.metadata["topics"][topic] = self.metadata["topics"].get(topic, 0) + 1
+        
+        time_key = f"{timestamp.year}-{timestamp.month:02d}"
+        self.metadata["time_ranges"][time_key] = self.metadata["time_ranges"].get(time_key, 0) + 1
+        
+        self._topic_set = None
+    
+    def _persist_indices(self):
+        """Persist all indices to disk."""
+        for name, index in self.indices.items():
+            if index:
+                storage_path = self.index_path / name
+                index.storage_context.persist(persist_dir=str(storage_path))
     
     def intelligent_search(
         self,
@@ -223,12 +472,11 @@ class HierarchicalIndexManager:
         query_lower = query.lower()
         
         # Time-based keywords
-        time_keywords = ["yesterday", "last week", "last month", "today", "recent"]
-        if any(kw in query_lower for kw in time_keywords) or time_filter:
+        if time_filter or _TIME_KEYWORDS_RE.search(query_lower):
             return "time"
         
         # Topic keywords
-        if topic_filter or any(topic in query_lower for topic in self.metadata.get("topics", {}).keys()):
+        if topic_filter or self._mentions_known_topic(query_lower):
             return "topic"
         
         # Exact match keywords (quotes, specific terms)
@@ -238,6 +486,22 @@ class HierarchicalIndexManager:
         # Default to semantic
         return "semantic"
     
+    def _mentions_known_topic(self, query_lower: str) -> bool:
+        """Check whether the query names any indexed topic."""
+        if self._topic_set is None:
+            # Single-word topics are matched by token; anything else by substring
+            self._topic_set = set()
+            self._topic_phrases = []
+            for topic in self.metadata.get("topics", {}):
+                if _WORD_RE.fullmatch(topic):
+                    self._topic_set.add(topic)
+                else:
+                    self._topic_phrases.append(topic)
+        
+        if not self._topic_set.isdisjoint(_WORD_RE.findall(query_lower)):
+            return True
+        return any(topic in query_lower for topic in self._topic_phrases)
+    
     def _time_based_search(
         self,
         query: str,
@@ -245,27 +509,30 @@ class HierarchicalIndexManager:
         time_filter: Dict[str, int]
     ) -> List[Dict[str, Any]]:
         """Search within specific time range."""
-        query_engine = self.indices["time"].as_query_engine(
-            similarity_top_k=top_k * 3  # Over-fetch for filtering
+        # Filter in the vector store so only matching nodes are scored
+        filters = MetadataFilters(filters=[
+            MetadataFilter(key=key, value=time_filter[key], operator=FilterOperator.EQ)
+            for key in ("year", "month", "day")
+            if key in time_filter
+        ])
+        query_engine = self._get_query_engine(
+            "time",
+            (top_k, tuple(sorted(time_filter.items()))),
+            similarity_top_k=top_k,
+            filters=filters
         )
         
         response = query_engine.query(query)
-        results = []
         
-        for node in response.source_nodes:
-            # Filter by time
-            if self._matches_time_filter(node.metadata, time_filter):
-                results.append({
-                    "text": node.text,
-                    "score": node.score,
-                    "metadata": node.metadata,
-                    "strategy": "time-based"
-                })
-                
-                if len(results) >= top_k:
-                    break
-        
-        return results
+        return [
+            {
+                "text": node.text,
+                "score": node.score,
+                "metadata": node.metadata,
+                "strategy": "time-based"
+            }
+            for node in response.source_nodes
+        ]
     
     def _topic_based_search(
         self,
@@ -274,32 +541,38 @@ class HierarchicalIndexManager:
         topic_filter: List[str]
     ) -> List[Dict[str, Any]]:
         """Search within specific topics."""
-        query_engine = self.indices["topic"].as_query_engine(
-            similarity_top_k=top_k * 3
+        # No indexed document carries any requested topic; skip the vector query
+        if not any(topic in self.metadata["topics"] for topic in topic_filter):
+            return []
+        
+        # Qdrant's IN already matches list payloads element-wise; the simple
+        # store needs ANY for the same semantics
+        operator = FilterOperator.IN if self._qdrant_client is not None else FilterOperator.ANY
+        filters = MetadataFilters(filters=[
+            MetadataFilter(key="topics", value=list(topic_filter), operator=operator)
+        ])
+        query_engine = self._get_query_engine(
+            "topic",
+            (top_k, frozenset(topic_filter)),
+            similarity_top_k=top_k,
+            filters=filters
         )
         
         response = query_engine.query(query)
-        results = []
         
-        for node in response.source_nodes:
-            # Filter by topics
-            node_topics = node.metadata.get("topics", [])
-            if any(topic in node_topics for topic in topic_filter):
-                results.append({
-                    "text": node.text,
-                    "score": node.score,
-                    "metadata": node.metadata,
-                    "strategy": "topic-based"
-                })
-                
-                if len(results) >= top_k:
-                    break
-        
-        return results
+        return [
+            {
+                "text": node.text,
+                "score": node.score,
+                "metadata": node.metadata,
+                "strategy": "topic-based"
+            }
+            for node in response.source_nodes
+        ]
     
     def _keyword_search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
         """Exact keyword matching."""
-        query_engine = self.indices["keyword"].as_query_engine()
+        query_engine = self._get_query_engine("keyword", ())
         response = query_engine.query(query)
         
         results = []
@@ -315,9 +588,7 @@ class HierarchicalIndexManager:
     
     def _semantic_search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
         """Semantic vector search."""
-        query_engine = self.indices["time"].as_query_engine(
-            similarity_top_k=top_k
-        )
+        query_engine = self._get_query_engine("time", (top_k,), similarity_top_k=top_k)
         
         response = query_engine.query(query)
         
@@ -332,26 +603,41 @@ class HierarchicalIndexManager:
         
         return results
     
-    def _matches_time_filter(
-        self,
-        metadata: Dict[str, Any],
-        time_filter: Dict[str, int]
-    ) -> bool:
-        """Check if document matches time filter."""
-        if "year" in time_filter and metadata.get("year") != time_filter["year"]:
-            return False
-        if "month" in time_filter and metadata.get("month") != time_filter["month"]:
-            return False
-        if "day" in time_filter and metadata.get("day") != time_filter["day"]:
-            return False
-        return True
+    def _get_query_engine(self, name: str, cache_key: Tuple, **engine_kwargs):
+        """
+        Return a cached query engine for an index, creating it on first use.
+        
+        Args:
+            name: Index name
+            cache_key: Hashable search parameters the engine depends on
+            **engine_kwargs: Arguments for as_query_engine on a cache miss
+        """
+        key = (name, cache_key)
+        query_engine = self._query_engines.get(key)
+        
+        if query_engine is None:
+            query_engine = self.indices[name].as_query_engine(**engine_kwargs)
+            self._query_engines[key] = query_engine
+            if len(self._query_engines) > self.QUERY_ENGINE_CACHE_SIZE:
+                self._query_engines.popitem(last=False)
+        else:
+            self._query_engines.move_to_end(key)
+        
+        return query_engine
     
-    def rebuild_indices(self, conversations_path: Path) -> Dict[str, int]:
+    def rebuild_indices(
+        self,
+        conversations_path: Path,
+        batch_size: int = 100,
+        read_workers: int = 8
+    ) -> Dict[str, int]:
         """
         Rebuild all indices from conversation files.
         
         Args:
             conversations_path: Path to conversations directory
+            batch_size: Files read and inserted per batch
+            read_workers: Threads reading conversation files concurrently
         
         Returns:
             Stats about rebuild process
@@ -372,66 +658,116 @@ class HierarchicalIndexManager:
                 import shutil
                 shutil.rmtree(storage_path)
         
+        # External vector stores live outside storage_path; clear them too
+        if self._vector_store_factory is not None:
+            for name in self.VECTOR_INDICES:
+                if self.indices.get(name) is not None:
+                    self.indices[name].vector_store.clear()
+        
         # Recreate indices
-        self.indices = {
-            "summary": self._load_or_create_index("summary", SummaryIndex),
-            "time": self._load_or_create_index("time", VectorStoreIndex),
-            "topic": self._load_or_create_index("topic", VectorStoreIndex),
-            "keyword": self._load_or_create_index("keyword", KeywordTableIndex)
-        }
+        self.indices = self._create_indices()
+        self._query_engines.clear()
         
-        # Process all conversation files
+        # Order files chronologically by path alone so stores see increasing
+        # keys (append-style writes) while contents are streamed in batches
+        entries = []
+        now = datetime.now()  # Fallback date for files outside the YYYY/MM/DD layout
         for file_path in conversations_path.rglob("*.md"):
             try:
-                content = file_path.read_text(encoding="utf-8")
-                
-                # Extract metadata from file path
-                parts = file_path.parts
-                year = int(parts[-4]) if len(parts) >= 4 else datetime.now().year
-                month = int(parts[-3]) if len(parts) >= 3 else datetime.now().month
-                day = int(parts[-2]) if len(parts) >= 2 else datetime.now().day
-                
-                timestamp = datetime(year, month, day)
-                doc_id = file_path.stem
-                
-                # Infer topics (basic heuristic)
-                topics = self._infer_topics(content)
-                
-                # Add to indices
-                success = self.add_document_hierarchical(
-                    text=content,
-                    doc_id=doc_id,
-                    timestamp=timestamp,
-                    topics=topics,
-                    metadata={"file_path": str(file_path)}
-                )
-                
-                stats["files_processed"] += 1
-                if success:
-                    stats["documents_added"] += 1
-                
+                entries.append((self._timestamp_from_path(file_path, now), file_path.stem, file_path))
             except Exception as e:
                 print(f"Error processing {file_path}: {e}")
                 stats["errors"] += 1
         
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+        
+        # Add to indices batch by batch, persisting once at the end
+        with self.bulk_mode(), ThreadPoolExecutor(max_workers=read_workers) as executor:
+            documents = self._iter_documents(entries, stats, executor, batch_size)
+            while True:
+                batch = list(islice(documents, batch_size))
+                if not batch:
+                    break
+                added = self.add_documents_batch(batch)
+                stats["documents_added"] += added
+                stats["errors"] += len(batch) - added
+        
         return stats
     
-    def _infer_topics(self, content: str) -> List[str]:
-        """Infer topics from content (basic keyword matching)."""
-        topics = []
+    def _timestamp_from_path(self, file_path: Path, now: Optional[datetime] = None) -> datetime:
+        """Derive a conversation's date from its YYYY/MM/DD directory layout."""
+        parts = file_path.parts
+        if len(parts) < 4:
+            now = now or datetime.now()
+        year = int(parts[-4]) if len(parts) >= 4 else now.year
+        month = int(parts[-3]) if len(parts) >= 3 else now.month
+        day = int(parts[-2]) if len(parts) >= 2 else now.day
+        
+        return datetime(year, month, day)
+    
+    def _iter_documents(
+        self,
+        entries,
+        stats: Dict[str, int],
+        executor: ThreadPoolExecutor,
+        chunk_size: int
+    ):
+        """
+        Lazily read conversation files into document dicts.
         
-        topic_keywords = {
-            "medical": ["doctor", "patient", "diagnosis", "treatment", "medication"],
-            "technical": ["code", "function", "error", "debug", "api"],
-            "personal": ["feeling", "emotion", "relationship", "family", "friend"],
-            "planning": ["goal", "plan", "schedule", "task", "deadline"]
-        }
+        Files are read concurrently, chunk_size at a time, so at most one
+        chunk of contents is held in memory.
         
+        Args:
+            entries: (timestamp, doc_id, file_path) tuples
+            stats: Rebuild stats, updated with processed files and errors
+            executor: Thread pool for file reads
+            chunk_size: Files read concurrently per chunk
+        
+        Yields:
+            Dicts accepted by add_documents_batch
+        """
+        for start in range(0, len(entries), chunk_size):
+            chunk = entries[start:start + chunk_size]
+            contents = executor.map(self._read_file, [file_path for _, _, file_path in chunk])
+            
+            for (timestamp, doc_id, file_path), content in zip(chunk, contents):
+                if isinstance(content, Exception):
+                    print(f"Error processing {file_path}: {content}")
+                    stats["errors"] += 1
+                    continue
+                
+                stats["files_processed"] += 1
+                
+                yield {
+                    "text": content,
+                    "doc_id": doc_id,
+                    "timestamp": timestamp,
+                    # Infer topics (basic heuristic)
+                    "topics": self._infer_topics(content),
+                    "metadata": {"file_path": str(file_path)}
+                }
+    
+    @staticmethod
+    def _read_file(file_path: Path):
+        """Read a conversation file, returning the exception instead of raising."""
+        try:
+            return file_path.read_text(encoding="utf-8")
+        except Exception as e:
+            return e
+    
+    def _infer_topics(self, content: str) -> List[str]:
+        """Infer topics from content (basic keyword matching)."""
         content_lower = content.lower()
         
-        for topic, keywords in topic_keywords.items():
-            if any(kw in content_lower for kw in keywords):
-                topics.append(topic)
+        if _TOPIC_AUTOMATON is not None:
+            found = {topic for _, topic in _TOPIC_AUTOMATON.iter(content_lower)}
+            topics = [topic for topic in _TOPIC_KEYWORDS if topic in found]
+        else:
+            topics = [
+                topic for topic, keywords in _TOPIC_KEYWORDS.items()
+                if any(kw in content_lower for kw in keywords)
+            ]
         
         return topics or ["general"]
     